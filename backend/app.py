@@ -1,27 +1,133 @@
 # app.py
+import io
 import os
-import uuid
+import secrets
 import json
+import codecs
+import heapq
 import atexit
+import logging
+import logging.handlers
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
 from datetime import datetime, timedelta
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, jsonify, request, send_file
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import pandas as pd
 from werkzeug.utils import secure_filename
 
+try:
+    import pyarrow  # noqa: F401  (enables the multithreaded pandas CSV engine)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import fcntl  # cross-process lock on edits logs (gunicorn workers share UPLOAD_FOLDER)
+except ImportError:
+    fcntl = None
+
+class _OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider (responses and request.get_json) backed by orjson"""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+if orjson is not None:
+    app.json = _OrjsonProvider(app)
 
 # ==========================
 # CONFIG
 # ==========================
 UPLOAD_FOLDER = os.environ.get("UPLOAD_FOLDER", "uploads")
+SESSIONS_DB = os.environ.get("SESSIONS_DB", "sessions.db")
+# legacy JSON store, imported once into SESSIONS_DB if the database is empty
 SESSIONS_FILE = os.environ.get("SESSIONS_FILE", "sessions.json")
 SESSION_EXPIRY_HOURS = int(os.environ.get("SESSION_EXPIRY_HOURS", "24"))
+DF_CACHE_SIZE = int(os.environ.get("DF_CACHE_SIZE", "32"))
+# upper bound between background sweeps of expired sessions
+SESSION_SWEEP_SECONDS = int(os.environ.get("SESSION_SWEEP_SECONDS", "900"))
+# quiet period after the last edit before the edits log is folded into the CSV
+EDITS_FOLD_SECONDS = float(os.environ.get("EDITS_FOLD_SECONDS", "30"))
+# rows serialized per chunk when streaming /api/data
+DATA_CHUNK_ROWS = int(os.environ.get("DATA_CHUNK_ROWS", "2000"))
 FRONTEND_URL = os.environ.get("FRONTEND_URL", "http://13.201.123.132:3000")
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# uploads are parsed in memory; larger requests are refused with 413 before they are read
+MAX_UPLOAD_MB = int(os.environ.get("MAX_UPLOAD_MB", "100"))
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_MB * 1024 * 1024
+# behind nginx: internal location aliased to UPLOAD_FOLDER (e.g. "/protected/"); nginx then serves downloads
+X_ACCEL_REDIRECT_PREFIX = os.environ.get("X_ACCEL_REDIRECT_PREFIX", "")
+# behind Apache mod_xsendfile: let send_file emit X-Sendfile instead of streaming the body
+app.config["USE_X_SENDFILE"] = os.environ.get("USE_X_SENDFILE", "0") == "1"
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# ==========================
+# Logging
+# ==========================
+logger = logging.getLogger("viewer")
+logger.setLevel(LOG_LEVEL)
+logger.propagate = False
+# Request threads only enqueue records; a listener thread does the formatting and stdout writes.
+# Set up once per process, so importing app.py again does not duplicate every line.
+if not any(isinstance(h, logging.handlers.QueueHandler) for h in logger.handlers):
+    _LOG_QUEUE = queue.SimpleQueue()
+    _log_output = logging.StreamHandler(sys.stdout)
+    _log_output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    _LOG_LISTENER = logging.handlers.QueueListener(_LOG_QUEUE, _log_output)
+    _LOG_LISTENER.start()
+    atexit.register(_LOG_LISTENER.stop)
+    logger.addHandler(logging.handlers.QueueHandler(_LOG_QUEUE))
+
+# in-memory view of the sessions table: token -> session dict
 SESSIONS = {}
+# min-heap of (expires_at timestamp, token); stale entries are skipped lazily
+_EXPIRY_HEAP = []
+# guards SESSIONS, _EXPIRY_HEAP and the shared sessions connection; taken before _DF_LOCK, never after
+_SESSIONS_LOCK = threading.RLock()
+# tokens whose in-memory last_accessed has not been written to the database yet
+_ACCESSED_TOKENS = set()
+# set when the expiry heap gets a new head, so the sweeper re-plans its sleep
+_SWEEP_WAKE = threading.Event()
+
+# csv_path -> ((csv mtime, edits log bytes replayed), normalized DataFrame), kept in LRU order
+_DF_CACHE = OrderedDict()
+# guards _DF_CACHE and the dicts/sets below up to _NEEDS_REWRITE; held only to read or change
+# them, never while parsing or writing (per-file work is serialized by _PATH_LOCKS instead)
+_DF_LOCK = threading.RLock()
+# csv_path -> {link: row position}; rows never move while a file is cached
+_LINK_INDEX = {}
+# csv_path -> {stripped, lower-cased "Verified By": row positions} for the verifier filter
+_VERIFIER_INDEX = {}
+# csv_path -> time.monotonic() deadline of its next fold
+_FOLD_DEADLINES = {}
+# set when a new earliest fold deadline is added, so the fold thread re-plans its sleep
+_FOLD_WAKE = threading.Event()
+# csv_path -> lock serializing this process's loads and edits of that file (the flock covers other workers)
+_PATH_LOCKS = {}
+# reviewed files stored in a non-canonical shape (older versions, imports); the next fold rewrites them
+_NEEDS_REWRITE = set()
+# path -> (mtime, detected encoding), kept in LRU order and guarded by _ENCODING_LOCK
+_ENCODING_CACHE = OrderedDict()
+_ENCODING_CACHE_SIZE = 256
+_ENCODING_LOCK = threading.Lock()
 
 # CORS configuration for production
 CORS(
@@ -34,113 +140,335 @@ CORS(
 # ==========================
 # Persistence helpers
 # ==========================
-def load_sessions():
-    """Load sessions from disk and clean expired ones"""
-    global SESSIONS
-    if os.path.exists(SESSIONS_FILE):
+_SESSION_FIELDS = ("csv_path", "created_at", "expires_at", "last_accessed", "original_filename", "total_rows")
+
+def _connect_sessions_db():
+    """Open the sessions database (WAL mode) and make sure the schema exists"""
+    conn = sqlite3.connect(SESSIONS_DB, check_same_thread=False, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS sessions ("
+        "token TEXT PRIMARY KEY, csv_path TEXT, created_at TEXT, expires_at TEXT, "
+        "last_accessed TEXT, original_filename TEXT, total_rows INTEGER)"
+    )
+    # databases created before total_rows was tracked
+    if "total_rows" not in {row["name"] for row in conn.execute("PRAGMA table_info(sessions)")}:
+        conn.execute("ALTER TABLE sessions ADD COLUMN total_rows INTEGER")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_sessions_expires_at ON sessions(expires_at)")
+    return conn
+
+_DB = _connect_sessions_db()
+
+def _row_to_session(row) -> dict:
+    """Convert a sessions table row into the dict shape kept in SESSIONS"""
+    return {field: row[field] for field in _SESSION_FIELDS if row[field] is not None}
+
+def _expiry_ts(session_data: dict) -> float:
+    """
+    expires_at as a POSIX timestamp (0 if missing or malformed, i.e. already expired).
+    The parsed value is memoized in the session dict next to the string it came from.
+    """
+    expires_at = session_data.get("expires_at", "")
+    cached = session_data.get("_expires_ts")
+    if cached and cached[0] == expires_at:
+        return cached[1]
+    try:
+        ts = datetime.fromisoformat(expires_at).timestamp()
+    except Exception:
+        ts = 0.0
+    session_data["_expires_ts"] = (expires_at, ts)
+    return ts
+
+def _track_expiry(token: str):
+    """Register a session in the expiry heap"""
+    with _SESSIONS_LOCK:
+        heapq.heappush(_EXPIRY_HEAP, (_expiry_ts(SESSIONS[token]), token))
+        if _EXPIRY_HEAP[0][1] == token:
+            _SWEEP_WAKE.set()
+
+def save_session(token: str):
+    """Insert or update a single session row from SESSIONS"""
+    with _SESSIONS_LOCK:
+        session_data = SESSIONS.get(token)
+        if session_data is None:
+            # deleted by another thread in the meantime
+            return
+        try:
+            _DB.execute(
+                f"INSERT OR REPLACE INTO sessions (token, {', '.join(_SESSION_FIELDS)}) "
+                f"VALUES (?{', ?' * len(_SESSION_FIELDS)})",
+                (token, *(session_data.get(field) for field in _SESSION_FIELDS)),
+            )
+        except Exception as e:
+            logger.error("[SESSIONS] Failed to save session %s: %s", token, e)
+
+def delete_sessions(tokens):
+    """Remove sessions from memory and from the database"""
+    with _SESSIONS_LOCK:
+        for token in tokens:
+            SESSIONS.pop(token, None)
+        try:
+            _DB.executemany("DELETE FROM sessions WHERE token = ?", [(t,) for t in tokens])
+        except Exception as e:
+            logger.warning("[SESSIONS] Failed to delete sessions: %s", e)
+
+def flush_last_accessed():
+    """Write the last_accessed times touched since the previous flush in one statement"""
+    with _SESSIONS_LOCK:
+        rows = [(SESSIONS[t]["last_accessed"], t) for t in _ACCESSED_TOKENS if t in SESSIONS]
+        _ACCESSED_TOKENS.clear()
+        if not rows:
+            return
         try:
-            with open(SESSIONS_FILE, "r", encoding="utf-8") as f:
-                SESSIONS = json.load(f)
-                print(f"[SESSIONS] Loaded {len(SESSIONS)} sessions from {SESSIONS_FILE}")
-                clean_expired_sessions()
+            _DB.executemany("UPDATE sessions SET last_accessed = ? WHERE token = ?", rows)
         except Exception as e:
-            print(f"[SESSIONS] Failed to load sessions: {e}")
-            SESSIONS = {}
+            logger.warning("[SESSIONS] Failed to flush last_accessed: %s", e)
 
-def save_sessions():
-    """Save sessions to disk"""
+def fetch_session(token: str):
+    """Load a session created by another worker process into SESSIONS"""
+    with _SESSIONS_LOCK:
+        row = _DB.execute("SELECT * FROM sessions WHERE token = ?", (token,)).fetchone()
+        if row is None:
+            return None
+        SESSIONS[token] = _row_to_session(row)
+        _track_expiry(token)
+        return SESSIONS[token]
+
+def _import_legacy_sessions():
+    """One-time import of the old sessions.json store into SESSIONS_DB"""
     try:
-        with open(SESSIONS_FILE, "w", encoding="utf-8") as f:
-            json.dump(SESSIONS, f)
-            print(f"[SESSIONS] Saved {len(SESSIONS)} sessions to {SESSIONS_FILE}")
+        with open(SESSIONS_FILE, "r", encoding="utf-8") as f:
+            legacy = json.load(f)
     except Exception as e:
-        print(f"[SESSIONS] Failed to save sessions: {e}")
+        logger.warning("[SESSIONS] Failed to read legacy %s: %s", SESSIONS_FILE, e)
+        return
+    for token, session_data in legacy.items():
+        if isinstance(session_data, str):
+            # Old format (token -> csv path) - give it a fresh expiry
+            now = datetime.now()
+            session_data = {
+                "csv_path": session_data,
+                "created_at": now.isoformat(),
+                "expires_at": (now + timedelta(hours=SESSION_EXPIRY_HOURS)).isoformat(),
+                "last_accessed": now.isoformat(),
+            }
+        SESSIONS[token] = session_data
+        save_session(token)
+    logger.info("[SESSIONS] Imported %s sessions from %s", len(legacy), SESSIONS_FILE)
 
-def clean_expired_sessions():
-    """Remove expired sessions and their associated files"""
+def load_sessions():
+    """Load sessions from the database and clean expired ones"""
     global SESSIONS
+    try:
+        with _SESSIONS_LOCK:
+            SESSIONS = {row["token"]: _row_to_session(row) for row in _DB.execute("SELECT * FROM sessions")}
+            if not SESSIONS and os.path.exists(SESSIONS_FILE):
+                _import_legacy_sessions()
+            _EXPIRY_HEAP[:] = [(_expiry_ts(data), token) for token, data in SESSIONS.items()]
+            heapq.heapify(_EXPIRY_HEAP)
+        logger.info("[SESSIONS] Loaded %s sessions from %s", len(SESSIONS), SESSIONS_DB)
+        clean_expired_sessions()
+    except Exception as e:
+        logger.error("[SESSIONS] Failed to load sessions: %s", e)
+        SESSIONS = {}
+
+def clean_expired_sessions():
+    """
+    Remove expired sessions and their associated files.
+    Pops the expiry heap until its head is in the future, so the cost is
+    proportional to the number of expirations, not to the number of sessions.
+    Sessions this worker never loaded (created by another worker) are found
+    through the expires_at index. Also persists the last_accessed times
+    collected since the previous run. Files are removed after the sessions
+    lock is released, so session lookups never wait on the filesystem.
+    """
     now = datetime.now()
+    now_ts = now.timestamp()
     expired_tokens = []
-    
-    for token, session_data in list(SESSIONS.items()):
-        if isinstance(session_data, str):
-            # Old format - migrate or remove
-            csv_path = session_data
-            if not os.path.exists(csv_path):
-                expired_tokens.append(token)
-            continue
-        
-        try:
-            expires_at = datetime.fromisoformat(session_data.get("expires_at", "2000-01-01"))
-        except Exception:
-            expires_at = datetime(2000, 1, 1)
-        if now > expires_at:
+    expired_paths = []
+    with _SESSIONS_LOCK:
+        flush_last_accessed()
+        while _EXPIRY_HEAP and _EXPIRY_HEAP[0][0] < now_ts:
+            ts, token = heapq.heappop(_EXPIRY_HEAP)
+            session_data = SESSIONS.get(token)
+            # already removed, or re-registered with a later expiry
+            if session_data is None or _expiry_ts(session_data) > ts:
+                continue
             expired_tokens.append(token)
-            csv_path = session_data.get("csv_path")
-            if csv_path and os.path.exists(csv_path):
-                try:
-                    os.remove(csv_path)
-                    print(f"[CLEANUP] Removed expired file: {csv_path}")
-                except Exception as e:
-                    print(f"[CLEANUP] Failed to remove {csv_path}: {e}")
-    
-    for token in expired_tokens:
-        del SESSIONS[token]
-    
-    if expired_tokens:
-        print(f"[CLEANUP] Removed {len(expired_tokens)} expired sessions")
-        save_sessions()
+            if session_data.get("csv_path"):
+                expired_paths.append(session_data["csv_path"])
 
-atexit.register(save_sessions)
-load_sessions()
+        try:
+            rows = _DB.execute("SELECT token, csv_path FROM sessions WHERE expires_at < ?", (now.isoformat(),)).fetchall()
+        except Exception as e:
+            logger.warning("[CLEANUP] Failed to query expired sessions: %s", e)
+            rows = []
+        seen = set(expired_tokens)
+        for row in rows:
+            if row["token"] in seen:
+                continue
+            expired_tokens.append(row["token"])
+            if row["csv_path"]:
+                expired_paths.append(row["csv_path"])
+
+        if expired_tokens:
+            delete_sessions(expired_tokens)
+
+    for csv_path in expired_paths:
+        _remove_reviewed_files(csv_path)
+    if expired_tokens:
+        logger.info("[CLEANUP] Removed %s expired sessions", len(expired_tokens))
 
 # ==========================
 # Helpers
 # ==========================
-def _normalize_columns_and_get_link_column(df: pd.DataFrame):
+_LINK_FUZZY_RE = re.compile(r"link|url", re.IGNORECASE)
+
+@lru_cache(maxsize=128)
+def _detect_columns(cols: tuple, strict_verified: bool = False):
     """
-    Normalize column names (strip spaces) and make a lower-case map.
-    Ensure a 'link' column exists (case-insensitive) by renaming it to 'link'.
-    Returns dataframe (possibly renamed) and the detected link column name.
+    Work out how a header maps onto the canonical columns (names stripped,
+    'link', 'Status', 'Feedback', 'Verified By'). Cached on the header tuple,
+    which is the same for every read of a given file.
+    strict_verified=True (uploads) only takes real 'Verified By' variants, so a
+    column like 'Verified Date' is kept and an empty 'Verified By' gets added.
+    Returns (rename_map, link_col, status_col, feedback_col, verified_col);
+    the *_col values are post-rename names, or None when not found.
     """
-    # strip whitespace from column names
-    new_cols = [c.strip() if isinstance(c, str) else c for c in df.columns]
-    df.columns = new_cols
+    names = [c.strip() if isinstance(c, str) else c for c in cols]
+    lowers = [c.lower() if isinstance(c, str) else "" for c in names]
+    rename_map = {c: n for c, n in zip(cols, names) if c != n}
 
-    # build map of lowercased column names to original
-    lower_map = {str(c).lower(): c for c in df.columns}
+    def _rename(i, canonical):
+        if names[i] != canonical:
+            rename_map[cols[i]] = canonical
+        return canonical
 
-    # common variants to check
+    # link: exact names first ('link' wins over 'url'), then any name containing either
+    link_i = None
     for candidate in ("link", "url"):
-        if candidate in lower_map:
-            orig = lower_map[candidate]
-            if orig != "link":
-                df = df.rename(columns={orig: "link"})
-            return df, "link"
+        if candidate in lowers:
+            link_i = lowers.index(candidate)
+            break
+    else:
+        link_i = next((i for i, lc in enumerate(lowers) if _LINK_FUZZY_RE.search(lc)), None)
+    link_col = _rename(link_i, "link") if link_i is not None else None
+
+    def _exact(canonical):
+        if canonical in names:
+            return canonical
+        lc = canonical.lower()
+        i = next((i for i, l in enumerate(lowers) if l == lc and i != link_i), None)
+        return _rename(i, canonical) if i is not None else None
 
-    # if nothing found, try to find any column that contains 'link' or 'url' substring
-    for orig in df.columns:
-        if isinstance(orig, str) and ("link" in orig.lower() or "url" in orig.lower()):
-            if orig != "link":
-                df = df.rename(columns={orig: "link"})
-            return df, "link"
+    status_col = _exact("Status")
+    feedback_col = _exact("Feedback")
+
+    # 'Verified By' variants ("verified" with "by", or just "verified"); stored files
+    # also accept a name ending in "verified", then any name that mentions it
+    verified_i = ending = fallback = None
+    for i, lc in enumerate(lowers):
+        lc = lc.replace("_", " ")
+        if i == link_i or "verified" not in lc:
+            continue
+        if "by" in lc or lc == "verified":
+            verified_i = i
+            break
+        if ending is None and lc.endswith("verified"):
+            ending = i
+        if fallback is None:
+            fallback = i
+    if verified_i is None and not strict_verified:
+        verified_i = ending if ending is not None else fallback
+    verified_col = _rename(verified_i, "Verified By") if verified_i is not None else None
 
-    return df, None
+    return rename_map, link_col, status_col, feedback_col, verified_col
 
-def _read_csv_with_fallbacks(path: str) -> pd.DataFrame:
+def _detect_encoding_bytes(sample: bytes, complete: bool = False) -> str:
     """
-    Try reading CSV with common encodings to handle BOM/utf errors.
+    Guess the text encoding of a CSV from a leading sample of its bytes.
+    complete=True means the sample is the whole file rather than a prefix.
+    Without charset_normalizer non-utf8 input maps to latin1, which is what
+    the brute-force fallback order would have settled on anyway.
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        sample.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        # a multi-byte character cut off by the end of the sample is still utf-8
+        if not complete and e.reason == "unexpected end of data" and e.start >= len(sample) - 3:
+            return "utf-8"
+    try:
+        from charset_normalizer import from_bytes
+    except ImportError:
+        return "latin1"
+    matches = list(from_bytes(sample))
+    if not matches or not matches[0].coherence:
+        # no language evidence in the sample (short or mostly ASCII): keep latin1
+        return "latin1"
+    best = matches[0]
+    # Western code pages score alike on accented Latin text; prefer cp1252 on a tie
+    if any(m.encoding == "cp1252" and m.coherence >= best.coherence for m in matches):
+        return "cp1252"
+    return best.encoding
+
+def _detect_encoding(path: str):
+    """Detect a file's encoding from its first 64 KB, cached per (path, mtime)"""
+    mtime = os.path.getmtime(path)
+    with _ENCODING_LOCK:
+        hit = _ENCODING_CACHE.get(path)
+        if hit and hit[0] == mtime:
+            _ENCODING_CACHE.move_to_end(path)
+            return hit[1]
+    with open(path, "rb") as f:
+        sample = f.read(65536)
+    enc = _detect_encoding_bytes(sample, complete=len(sample) < 65536)
+    with _ENCODING_LOCK:
+        _ENCODING_CACHE[path] = (mtime, enc)
+        _ENCODING_CACHE.move_to_end(path)
+        while len(_ENCODING_CACHE) > _ENCODING_CACHE_SIZE:
+            _ENCODING_CACHE.popitem(last=False)
+    return enc
+
+def _read_csv_with_fallbacks(source) -> pd.DataFrame:
+    """
+    Read a CSV (a file path, or the raw bytes of an upload) using its detected
+    encoding, then common encodings to handle BOM/utf errors.
     Returns a pandas DataFrame or raises the last exception.
     """
     tried = []
     exceptions = []
     encodings = ["utf-8-sig", "utf-8", "latin1", "cp1252"]
+    if isinstance(source, bytes):
+        label = "upload"
+        detected = _detect_encoding_bytes(source[:65536], complete=len(source) <= 65536)
+    else:
+        label = source
+        detected = _detect_encoding(source)
+    encodings = [detected] + [enc for enc in encodings if enc != detected]
+
+    def _open():
+        return io.BytesIO(source) if isinstance(source, bytes) else source
+
     for enc in encodings:
+        if HAS_PYARROW:
+            try:
+                return pd.read_csv(_open(), dtype=str, encoding=enc, engine="pyarrow",
+                                   keep_default_na=False, na_filter=False)
+            except Exception as e:
+                logger.warning("[CSV] pyarrow engine failed for %s (%s), using C engine: %s", label, enc, e)
         try:
-            df = pd.read_csv(path, dtype=str, encoding=enc)
-            # convert NaNs to empty strings for consistent downstream handling
-            df = df.fillna("")
-            return df
+            # empty cells come back as "" rather than NaN, so no fillna pass is needed downstream;
+            # files on disk are memory-mapped instead of copied through a read buffer; that is
+            # safe because reviewed files are only ever replaced (_replace_file), never truncated
+            return pd.read_csv(_open(), dtype=str, encoding=enc, keep_default_na=False, na_filter=False,
+                               memory_map=not isinstance(source, bytes))
         except Exception as e:
             tried.append(enc)
             exceptions.append((enc, str(e)))
@@ -149,108 +477,521 @@ def _read_csv_with_fallbacks(path: str) -> pd.DataFrame:
     err_msgs = "; ".join([f"{enc}: {msg}" for enc, msg in exceptions])
     raise Exception(f"All encodings failed ({err_msgs})")
 
+_STATUS_MAP = {
+    "accept": "Accepted", "accepted": "Accepted", "acept": "Accepted", "acpt": "Accepted",
+    "reject": "Rejected", "rejected": "Rejected", "rej": "Rejected",
+}
+# anything else starting with accept/reject (e.g. "accepted!") still counts
+_STATUS_PREFIX_RE = re.compile(r"(accept)|(reject)")
+
 def _normalize_status_value(val: str) -> str:
     """
     Normalize various status text variants to canonical values used by frontend:
       - 'Accepted' for accepts
       - 'Rejected' for rejects
       - '' (empty) for pending / unknown
+    Unrecognized values are returned trimmed.
     """
     if val is None:
         return ""
     s = str(val).strip()
-    if s == "":
-        return ""
     ls = s.lower()
-    # common accept variants
-    if ls in ("accept", "accepted", "acept", "acpt") or ls.startswith("accept"):
-        return "Accepted"
-    # common reject variants
-    if ls in ("reject", "rejected", "rej") or ls.startswith("reject"):
-        return "Rejected"
-    # if value is already canonical
-    if s in ("Accepted", "Rejected"):
-        return s
-    # otherwise, return trimmed original
+    canonical = _STATUS_MAP.get(ls)
+    if canonical:
+        return canonical
+    m = _STATUS_PREFIX_RE.match(ls)
+    if m:
+        return "Accepted" if m.group(1) else "Rejected"
     return s
 
-def _find_verified_column(df: pd.DataFrame):
+def _normalize_status_series(s: pd.Series) -> pd.Series:
     """
-    Find a column that represents 'Verified By' (various variants).
-    Return the column name or None.
+    Vectorized equivalent of _normalize_status_value for a whole column:
+    one lowercase pass, a dict .map and two prefix masks instead of a
+    Python call per row.
     """
-    for c in df.columns:
-        if not isinstance(c, str):
-            continue
-        lc = c.lower().replace("_", " ").strip()
-        # match common variants
-        if "verified" in lc and ("by" in lc or lc.endswith("verified") or lc == "verified"):
-            return c
-        if lc in ("verified by", "verified_by", "verifiedby", "verified"):
-            return c
-    # fallback: try any column that contains 'verified' substring
-    for c in df.columns:
-        if isinstance(c, str) and "verified" in c.lower():
-            return c
-    return None
+    trimmed = s.fillna("").astype(str).str.strip()
+    lowered = trimmed.str.lower()
+    out = lowered.map(_STATUS_MAP)
+    out = out.mask(out.isna() & lowered.str.startswith("accept"), "Accepted")
+    out = out.mask(out.isna() & lowered.str.startswith("reject"), "Rejected")
+    return out.fillna(trimmed)
 
 def get_session_from_request():
     """Extract and validate session token from request"""
     token = request.headers.get("X-Session-Token") or request.args.get("token")
     if not token:
-        print("[DEBUG] Missing token in request")
+        logger.debug("[SESSION] Missing token in request")
         return None, None
     
-    session_data = SESSIONS.get(token)
+    session_data = SESSIONS.get(token) or fetch_session(token)
     if not session_data:
-        print(f"[DEBUG] Token {token} not found in sessions")
+        logger.debug("[SESSION] Token %s not found in sessions", token)
         return None, None
     
-    # Handle old format (string) - migrate to new format
-    if isinstance(session_data, str):
-        csv_path = session_data
-        expires_at = datetime.now() + timedelta(hours=SESSION_EXPIRY_HOURS)
-        session_data = {
-            "csv_path": csv_path,
-            "created_at": datetime.now().isoformat(),
-            "expires_at": expires_at.isoformat(),
-            "last_accessed": datetime.now().isoformat()
-        }
-        SESSIONS[token] = session_data
-        save_sessions()
-    else:
-        # Check if session is expired
-        try:
-            expires_at = datetime.fromisoformat(session_data.get("expires_at", "2000-01-01"))
-        except Exception:
-            expires_at = datetime(2000, 1, 1)
-        if datetime.now() > expires_at:
-            print(f"[DEBUG] Token {token} has expired")
-            csv_path = session_data.get("csv_path")
-            if csv_path and os.path.exists(csv_path):
-                try:
-                    os.remove(csv_path)
-                except Exception as e:
-                    print(f"[CLEANUP] Failed to remove {csv_path}: {e}")
-            del SESSIONS[token]
-            save_sessions()
-            return None, None
-        
-        # Update last accessed time
-        session_data["last_accessed"] = datetime.now().isoformat()
-        save_sessions()
+    # Check if session is expired
+    now = datetime.now()
+    if now.timestamp() > _expiry_ts(session_data):
+        logger.debug("[SESSION] Token %s has expired", token)
+        csv_path = session_data.get("csv_path")
+        if csv_path:
+            _remove_reviewed_files(csv_path)
+        delete_sessions([token])
+        return None, None
+    
+    # Update last accessed time in memory only; flush_last_accessed() persists it in batches
+    with _SESSIONS_LOCK:
+        session_data["last_accessed"] = now.isoformat()
+        _ACCESSED_TOKENS.add(token)
     
     csv_path = session_data.get("csv_path")
     if not csv_path or not os.path.exists(csv_path):
-        print(f"[DEBUG] CSV file not found for token {token}")
-        # remove stale session entry if present
-        if token in SESSIONS:
-            del SESSIONS[token]
-            save_sessions()
+        logger.debug("[SESSION] CSV file not found for token %s", token)
+        # remove stale session entry
+        delete_sessions([token])
         return None, None
     
     return token, csv_path
 
+# ==========================
+# DataFrame cache
+# ==========================
+def _canonicalize_df(df: pd.DataFrame, strict_verified: bool = False) -> pd.DataFrame:
+    """
+    Bring a reviewed DataFrame into the shape every endpoint works with:
+    a stripped 'link' column plus canonical Status, Feedback and Verified By.
+    If no link column can be detected the frame is returned without one.
+    strict_verified is passed on to _detect_columns (True for uploads).
+    """
+    rename_map, link_col, status_col, feedback_col, verified_col = _detect_columns(tuple(df.columns), strict_verified)
+    if rename_map:
+        df = df.rename(columns=rename_map)
+    if link_col:
+        df["link"] = df["link"].astype(str).str.strip()
+
+    # Normalize status values; add missing Status/Feedback/Verified By so the frontend always sees them
+    if status_col:
+        df["Status"] = _normalize_status_series(df["Status"])
+    else:
+        df["Status"] = ""
+    if not feedback_col:
+        df["Feedback"] = ""
+    if not verified_col:
+        df["Verified By"] = ""
+
+    # a handful of distinct values each: store one small code per row instead of a string
+    df["Status"] = df["Status"].astype("category")
+    df["Verified By"] = df["Verified By"].astype(str).astype("category")
+    return df
+
+def _edits_path(csv_path: str) -> str:
+    """Side-car JSONL file holding status edits not yet folded into csv_path"""
+    return f"{csv_path}.edits.jsonl"
+
+def _lock_path(csv_path: str) -> str:
+    """Side-car file that worker processes flock to serialize edits of csv_path"""
+    return f"{csv_path}.lock"
+
+def _path_lock(csv_path: str):
+    """This process's lock for csv_path (reentrant, created on first use)"""
+    with _DF_LOCK:
+        return _PATH_LOCKS.setdefault(csv_path, threading.RLock())
+
+@contextmanager
+def _edits_lock(csv_path: str):
+    """
+    Exclusive lock on csv_path's edits log and base file, held across worker
+    processes (and threads) while appending edits or folding them in.
+    Take it before _DF_LOCK, never while holding it.
+    """
+    with _path_lock(csv_path), open(_lock_path(csv_path), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def _replace_file(path: str, write):
+    """
+    Produce path through write(tmp_path) and move it into place with os.replace,
+    so other workers never read (or memory-map) a truncated or half-written file.
+    """
+    tmp_path = f"{path}.{secrets.token_hex(4)}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _parquet_path(csv_path: str) -> str:
+    """Columnar working copy of a reviewed CSV, used for fast cold loads"""
+    return f"{os.path.splitext(csv_path)[0]}.parquet"
+
+def _write_parquet(csv_path: str, df: pd.DataFrame):
+    """Write the Parquet working copy next to csv_path (no-op without pyarrow)"""
+    if not HAS_PYARROW:
+        return
+    try:
+        _replace_file(_parquet_path(csv_path),
+                      lambda tmp: df.to_parquet(tmp, engine="pyarrow", compression="zstd", index=False))
+    except Exception as e:
+        logger.warning("[PARQUET] Failed to write %s: %s", _parquet_path(csv_path), e)
+
+def _read_reviewed(csv_path: str) -> pd.DataFrame:
+    """
+    Read a reviewed file into its canonical frame, preferring the Parquet copy
+    when it is at least as new as the CSV (it is written already canonical).
+    """
+    parquet_path = _parquet_path(csv_path)
+    if HAS_PYARROW and os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path):
+        try:
+            # the frame may keep views of the mapping; writers only os.replace the file, so the
+            # mapped inode stays intact for as long as it is referenced
+            df = pd.read_parquet(parquet_path, engine="pyarrow", memory_map=True)
+            # category codes come back as a read-only view of Arrow memory; copy them so iat can write
+            df["Status"] = df["Status"].copy()
+            return df
+        except Exception as e:
+            logger.warning("[PARQUET] Failed to read %s, falling back to CSV: %s", parquet_path, e)
+    raw = _read_csv_with_fallbacks(csv_path)
+    header = tuple(raw.columns)
+    before = {c: raw[c] for c in ("link", "Status") if c in header}
+    df = _canonicalize_df(raw)
+    changed = tuple(df.columns) != header or any(
+        not df[c].astype(str).equals(col.astype(str)) for c, col in before.items())
+    with _DF_LOCK:
+        if changed:
+            _NEEDS_REWRITE.add(csv_path)
+        else:
+            _NEEDS_REWRITE.discard(csv_path)
+    return df
+
+def _df_version(csv_path: str):
+    """
+    Cache validator: base file mtime plus the size of its pending edits log.
+    The mtime is read first: a fold replaces the CSV before it removes the log,
+    so a version taken mid-fold never matches a later state of the files.
+    """
+    mtime = os.path.getmtime(csv_path)
+    edits_path = _edits_path(csv_path)
+    edits_size = os.path.getsize(edits_path) if os.path.exists(edits_path) else 0
+    return (mtime, edits_size)
+
+def _store_df(csv_path: str, df: pd.DataFrame, version=None):
+    """
+    Cache df as the contents of csv_path at version (see _df_version). The
+    default re-reads the version, which is only exact right after persisting
+    under _edits_lock (or for a file no other worker knows about yet).
+    """
+    if version is None:
+        version = _df_version(csv_path)
+    with _DF_LOCK:
+        _DF_CACHE[csv_path] = (version, df)
+        _DF_CACHE.move_to_end(csv_path)
+        while len(_DF_CACHE) > DF_CACHE_SIZE:
+            evicted, _ = _DF_CACHE.popitem(last=False)
+            _forget_indexes(evicted)
+
+def _evict_df(csv_path: str):
+    """Drop any cached DataFrame and derived indexes for csv_path"""
+    with _DF_LOCK:
+        _DF_CACHE.pop(csv_path, None)
+        _forget_indexes(csv_path)
+
+def _forget_indexes(csv_path: str):
+    """Drop the lookups derived from csv_path's rows (call with _DF_LOCK held)"""
+    _LINK_INDEX.pop(csv_path, None)
+    _VERIFIER_INDEX.pop(csv_path, None)
+
+def _link_index(csv_path: str, df: pd.DataFrame) -> dict:
+    """
+    Map each link to its row position (first occurrence wins), built once per
+    parsed file. Edits only touch Status/Feedback, so the mapping stays valid.
+    """
+    with _DF_LOCK:
+        index = _LINK_INDEX.get(csv_path)
+    if index is None:
+        # built outside the lock; a racing thread builds the same mapping, so either copy may win
+        links = df["link"]
+        first = ~links.duplicated(keep="first")
+        index = dict(zip(links[first].to_numpy(), first.to_numpy().nonzero()[0].tolist()))
+        with _DF_LOCK:
+            index = _LINK_INDEX.setdefault(csv_path, index)
+    return index
+
+def _verifier_index(csv_path: str, df: pd.DataFrame) -> dict:
+    """
+    Map each normalized "Verified By" value to its row positions, built once per
+    parsed file so a filtered request only touches its own rows. Edits never
+    touch that column, so the mapping stays valid.
+    """
+    with _DF_LOCK:
+        index = _VERIFIER_INDEX.get(csv_path)
+    if index is None:
+        keys = df["Verified By"].astype(str).str.strip().str.lower().to_numpy()
+        index = pd.Series(keys).groupby(keys, sort=False).indices
+        with _DF_LOCK:
+            index = _VERIFIER_INDEX.setdefault(csv_path, index)
+    return index
+
+def _add_status_categories(df: pd.DataFrame, values):
+    """Register new Status values with a categorical Status column before they are written"""
+    col = df["Status"]
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        missing = [v for v in dict.fromkeys(values) if v not in col.cat.categories]
+        if missing:
+            df["Status"] = col.cat.add_categories(missing)
+
+def _replay_edits(df: pd.DataFrame, csv_path: str, offset: int = 0):
+    """
+    Apply the pending edits log from byte offset on (last edit per link wins) on top of df.
+    Returns (df, offset just past the last complete line applied); a line still being
+    appended is left for the next replay.
+    """
+    edits_path = _edits_path(csv_path)
+    if "link" not in df.columns or not os.path.exists(edits_path):
+        return df, offset
+    with open(edits_path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    edits = {}
+    for line in data[:end].splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            edit = json.loads(line)
+        except ValueError:
+            # a torn line from a crash mid-append; skip it
+            logger.warning("[EDITS] Skipping malformed line in %s", edits_path)
+            continue
+        edits[edit["link"]] = (edit.get("status", ""), edit.get("feedback", ""))
+    offset += end
+    if not edits:
+        return df, offset
+    edits_df = pd.DataFrame.from_dict(edits, orient="index", columns=["Status", "Feedback"])
+    mask = df["link"].isin(edits_df.index)
+    _add_status_categories(df, edits_df["Status"].unique())
+    df.loc[mask, "Status"] = df.loc[mask, "link"].map(edits_df["Status"])
+    df.loc[mask, "Feedback"] = df.loc[mask, "link"].map(edits_df["Feedback"])
+    return df, offset
+
+def _append_edits(csv_path: str, edits):
+    """
+    Record row edits ({link, status, feedback} dicts) with a single append, not a CSV rewrite.
+    Call with _edits_lock(csv_path) held so a concurrent fold cannot drop them.
+    """
+    lines = "".join(json.dumps(edit) + "\n" for edit in edits)
+    with open(_edits_path(csv_path), "a", encoding="utf-8") as f:
+        f.write(lines)
+    _schedule_fold(csv_path)
+
+def _resolve_row(csv_path: str, df: pd.DataFrame, link, index):
+    """
+    Find the row an update refers to: by link (preferred) or by legacy index.
+    Returns (row position, None) or (None, error message).
+    """
+    if link:
+        target_idx = _link_index(csv_path, df).get(str(link).strip())
+        if target_idx is None:
+            return None, "Link not found"
+        return target_idx, None
+    # fallback to index if provided (legacy)
+    if index is None:
+        return None, "Missing index or link to identify row"
+    try:
+        idx = int(index)
+    except Exception:
+        return None, "Invalid index (must be integer)"
+    if not (0 <= idx < len(df)):
+        return None, "Invalid index"
+    return idx, None
+
+def _apply_status(df: pd.DataFrame, target_idx: int, status, feedback) -> dict:
+    """Set Status/Feedback on one row in place and return the edit to log"""
+    canonical = _normalize_status_value(status)
+    stored_feedback = str(feedback or "") if canonical == "Rejected" else ""
+    _add_status_categories(df, [canonical])
+    # positional setters skip label resolution/alignment for a single-cell write
+    df.iat[target_idx, df.columns.get_loc("Status")] = canonical
+    df.iat[target_idx, df.columns.get_loc("Feedback")] = stored_feedback
+    return {"link": df.iat[target_idx, df.columns.get_loc("link")], "status": canonical, "feedback": stored_feedback}
+
+def _cached_df(csv_path: str, version):
+    """Shallow copy of the cached frame for csv_path if it is at version, else None"""
+    with _DF_LOCK:
+        hit = _DF_CACHE.get(csv_path)
+        if hit and hit[0] == version:
+            _DF_CACHE.move_to_end(csv_path)
+            return hit[1].copy(deep=False)
+    return None
+
+def _load_df(csv_path: str) -> pd.DataFrame:
+    """
+    Return the canonical DataFrame for a reviewed CSV with pending edits applied.
+    The file is only parsed when it is not cached yet or it (or its edits log)
+    changed; when only the edits log grew (another worker appended), just the new
+    lines are replayed onto the cached frame. Callers get a shallow copy and must
+    _store_df() what they persist. Parsing holds only csv_path's own lock, so
+    other files are served meanwhile.
+    """
+    df = _cached_df(csv_path, _df_version(csv_path))
+    if df is not None:
+        return df
+    with _path_lock(csv_path):
+        # another thread may have loaded it while this one waited
+        mtime, edits_size = version = _df_version(csv_path)
+        df = _cached_df(csv_path, version)
+        if df is not None:
+            return df
+        with _DF_LOCK:
+            hit = _DF_CACHE.get(csv_path)
+
+        if hit and hit[0][0] == mtime and hit[0][1] < edits_size:
+            # same base file and the log only grew: replay the bytes this worker has not seen
+            df, offset = _replay_edits(hit[1].copy(deep=False), csv_path, hit[0][1])
+            rewrite = False
+        else:
+            # cache under the mtime seen before parsing: if another worker folds meanwhile,
+            # the entry is merely stale and reloaded next time, never mislabeled as current
+            df = _read_reviewed(csv_path)
+            df, offset = _replay_edits(df, csv_path)
+            with _DF_LOCK:
+                _forget_indexes(csv_path)
+                rewrite = csv_path in _NEEDS_REWRITE
+        _store_df(csv_path, df, (mtime, offset))
+        if rewrite:
+            # write the canonical form back once, so downloads and later loads see it
+            _schedule_fold(csv_path)
+        return df.copy(deep=False)
+
+def _fold_edits(csv_path: str) -> pd.DataFrame:
+    """
+    Merge the pending edits log into csv_path, drop the log and return the frame.
+    Files still in a non-canonical shape are rewritten too; otherwise this is a no-op.
+    Runs under _edits_lock, so no worker can append between reading the log and removing it;
+    _DF_LOCK is only taken to update the cache, so other files stay served while this one is written.
+    """
+    with _edits_lock(csv_path):
+        df = _load_df(csv_path)
+        edits_path = _edits_path(csv_path)
+        has_edits = os.path.exists(edits_path)
+        with _DF_LOCK:
+            rewrite = csv_path in _NEEDS_REWRITE
+        if has_edits or rewrite:
+            # replace rather than rewrite: other workers may be reading the current file
+            _replace_file(csv_path, lambda tmp: df.to_csv(tmp, index=False, encoding="utf-8"))
+            _write_parquet(csv_path, df)
+            if has_edits:
+                os.remove(edits_path)
+            with _DF_LOCK:
+                _NEEDS_REWRITE.discard(csv_path)
+            _store_df(csv_path, df)
+            logger.info("[EDITS] Folded pending edits into %s", csv_path)
+        return df
+
+def _is_folded(csv_path: str) -> bool:
+    """
+    True when csv_path is known, without parsing it, to be canonical with no pending edits:
+    there is no edits log, and either the Parquet copy (always written canonical, after
+    the CSV) is at least as new as it or this worker cached it and found nothing to rewrite.
+    """
+    if os.path.exists(_edits_path(csv_path)):
+        return False
+    mtime = os.path.getmtime(csv_path)
+    parquet_path = _parquet_path(csv_path)
+    if HAS_PYARROW and os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= mtime:
+        return True
+    with _DF_LOCK:
+        hit = _DF_CACHE.get(csv_path)
+        return bool(hit) and hit[0] == (mtime, 0) and csv_path not in _NEEDS_REWRITE
+
+def _schedule_fold(csv_path: str):
+    """(Re)set the deadline at which the fold thread folds csv_path's edits log, once edits go quiet"""
+    deadline = time.monotonic() + EDITS_FOLD_SECONDS
+    with _DF_LOCK:
+        # the thread sleeps until the earliest deadline; only a new earliest one needs to wake it
+        earliest = min(_FOLD_DEADLINES.values(), default=None)
+        _FOLD_DEADLINES[csv_path] = deadline
+    if earliest is None or deadline < earliest:
+        _FOLD_WAKE.set()
+
+def _fold_pending(csv_path: str):
+    """Fold the edits log (or rewrite a non-canonical file) if still needed"""
+    with _DF_LOCK:
+        pending = csv_path in _NEEDS_REWRITE
+    # _fold_edits takes _edits_lock, which must not be requested while holding _DF_LOCK
+    if not os.path.exists(csv_path) or not (pending or os.path.exists(_edits_path(csv_path))):
+        return
+    try:
+        _fold_edits(csv_path)
+    except Exception as e:
+        logger.warning("[EDITS] Failed to fold edits for %s: %s", csv_path, e)
+
+@atexit.register
+def _flush_pending_edits():
+    """Fold every pending edits log before the process exits"""
+    with _DF_LOCK:
+        paths = list(_FOLD_DEADLINES)
+        _FOLD_DEADLINES.clear()
+    for csv_path in paths:
+        _fold_pending(csv_path)
+
+def _fold_loop():
+    """Fold thread: fold every file whose deadline has passed, then sleep until the next one"""
+    while True:
+        with _DF_LOCK:
+            now = time.monotonic()
+            due = [path for path, deadline in _FOLD_DEADLINES.items() if deadline <= now]
+            for csv_path in due:
+                del _FOLD_DEADLINES[csv_path]
+            delay = min(_FOLD_DEADLINES.values()) - now if _FOLD_DEADLINES else None
+        if due:
+            for csv_path in due:
+                _fold_pending(csv_path)
+            continue
+        _FOLD_WAKE.wait(delay)
+        _FOLD_WAKE.clear()
+
+def _remove_reviewed_files(csv_path: str):
+    """Delete a session's reviewed CSV, its Parquet copy, its edits log and lock file, and any cached frame"""
+    with _DF_LOCK:
+        _FOLD_DEADLINES.pop(csv_path, None)
+        _NEEDS_REWRITE.discard(csv_path)
+        _PATH_LOCKS.pop(csv_path, None)
+    for path in (csv_path, _parquet_path(csv_path), _edits_path(csv_path), _lock_path(csv_path)):
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+                logger.info("[CLEANUP] Removed expired file: %s", path)
+            except Exception as e:
+                logger.warning("[CLEANUP] Failed to remove %s: %s", path, e)
+    with _ENCODING_LOCK:
+        _ENCODING_CACHE.pop(csv_path, None)
+    _evict_df(csv_path)
+
+def _sweep_sessions():
+    """Sweeper thread: run cleanup when the earliest session is due, at least every SESSION_SWEEP_SECONDS"""
+    while True:
+        with _SESSIONS_LOCK:
+            delay = _EXPIRY_HEAP[0][0] - datetime.now().timestamp() if _EXPIRY_HEAP else SESSION_SWEEP_SECONDS
+        _SWEEP_WAKE.wait(min(max(delay, 1), SESSION_SWEEP_SECONDS))
+        _SWEEP_WAKE.clear()
+        try:
+            clean_expired_sessions()
+        except Exception as e:
+            logger.warning("[CLEANUP] Session sweep failed: %s", e)
+
+load_sessions()
+atexit.register(flush_last_accessed)
+threading.Thread(target=_sweep_sessions, name="session-sweeper", daemon=True).start()
+threading.Thread(target=_fold_loop, name="edits-folder", daemon=True).start()
+
 # ==========================
 # Routes
 # ==========================
@@ -259,6 +1000,11 @@ def health_check():
     """Health check endpoint for AWS load balancer"""
     return jsonify({"status": "healthy", "timestamp": datetime.now().isoformat()}), 200
 
+@app.errorhandler(413)
+def request_too_large(e):
+    """JSON error for requests over MAX_CONTENT_LENGTH (MAX_UPLOAD_MB)"""
+    return jsonify({"error": f"File too large (limit is {MAX_UPLOAD_MB} MB)"}), 413
+
 @app.route("/api/upload", methods=["POST"])
 def upload_csv():
     """Handle CSV file upload and create new session"""
@@ -270,111 +1016,58 @@ def upload_csv():
         return jsonify({"error": "Empty filename"}), 400
     
     filename = secure_filename(csv_file.filename)
-    upload_path = os.path.join(UPLOAD_FOLDER, f"{uuid.uuid4().hex}_{filename}")
-    csv_file.save(upload_path)
-    print(f"[UPLOAD] saved temp upload -> {upload_path}")
     
+    # Parse straight from the request stream; only the reviewed CSV is written to disk
     try:
-        df = _read_csv_with_fallbacks(upload_path)
+        df = _read_csv_with_fallbacks(csv_file.stream.read())
     except Exception as e:
-        try:
-            os.remove(upload_path)
-        except Exception:
-            pass
-        print(f"[UPLOAD] Failed to read uploaded CSV: {e}")
+        logger.warning("[UPLOAD] Failed to read uploaded CSV: %s", e)
         return jsonify({"error": f"Failed to read CSV: {e}"}), 400
     
-    # Normalize columns and ensure a link column exists
-    df, link_col = _normalize_columns_and_get_link_column(df)
-    if not link_col:
-        try:
-            os.remove(upload_path)
-        except Exception:
-            pass
-        print("[UPLOAD] CSV missing 'link' column (case-insensitive search failed)")
+    # Normalize columns (link/Status/Feedback/Verified By) and ensure a link column exists
+    df = _canonicalize_df(df, strict_verified=True)
+    if "link" not in df.columns:
+        logger.warning("[UPLOAD] CSV missing 'link' column (case-insensitive search failed)")
         return jsonify({"error": "'link' column not found in CSV (expected column named Link, link, URL, etc.)"}), 400
 
-    # Ensure link column values are strings and strip whitespace
-    df["link"] = df["link"].astype(str).str.strip()
-
-    # Remove empty links
-    before_count = len(df)
-    df = df[df["link"] != ""].reset_index(drop=True)
-    removed_empty = before_count - len(df)
-
-    # Remove duplicates based on link column
-    original_count = len(df)
-    df = df.drop_duplicates(subset=["link"], keep="first").reset_index(drop=True)
-    duplicates_removed = original_count - len(df)
-    
-    # Normalize Status/Feedback/Verified columns
-    col_map = {c: c.strip() for c in df.columns}
-    if any(k != v for k, v in col_map.items()):
-        df = df.rename(columns=col_map)
-
-    # rename case-insensitive status/feedback/verified to canonical names
-    for c in list(df.columns):
-        if c.lower() == "status" and c != "Status":
-            df = df.rename(columns={c: "Status"})
-        if c.lower() == "feedback" and c != "Feedback":
-            df = df.rename(columns={c: "Feedback"})
-        # Verified By variants -> canonical "Verified By"
-        lc = c.lower().replace("_", " ").strip()
-        if "verified" in lc and ("by" in lc or lc == "verified"):
-            if c != "Verified By":
-                df = df.rename(columns={c: "Verified By"})
-
-    # ensure columns exist
-    if "Status" not in df.columns:
-        df["Status"] = ""
-    if "Feedback" not in df.columns:
-        df["Feedback"] = ""
-    if "Verified By" not in df.columns:
-        # leave absent if not provided; we'll add empty column so frontend always sees it
-        df["Verified By"] = ""
-
-    # Normalize status values so frontend shows Accepted/Rejected/Pending consistently
-    df["Status"] = df["Status"].apply(_normalize_status_value)
-
-    # Replace NaN with empty string
-    df = df.fillna("")
+    # Drop empty and duplicate links (already stripped) with a single boolean mask
+    links = df["link"]
+    non_empty = links != ""
+    duplicate = links.duplicated(keep="first")
+    removed_empty = int((~non_empty).sum())
+    duplicates_removed = int((non_empty & duplicate).sum())
+    df = df.loc[non_empty & ~duplicate].reset_index(drop=True)
 
-    base, _ext = os.path.splitext(upload_path)
-    reviewed_path = f"{base}_reviewed.csv"
+    base, _ext = os.path.splitext(filename)
+    reviewed_path = os.path.join(UPLOAD_FOLDER, f"{secrets.token_hex(16)}_{base}_reviewed.csv")
 
     try:
-        df.to_csv(reviewed_path, index=False, encoding="utf-8")
+        _replace_file(reviewed_path, lambda tmp: df.to_csv(tmp, index=False, encoding="utf-8"))
     except Exception as e:
-        print(f"[UPLOAD] Failed to save reviewed CSV: {e}")
-        try:
-            os.remove(upload_path)
-        except Exception:
-            pass
+        logger.error("[UPLOAD] Failed to save reviewed CSV: %s", e)
         return jsonify({"error": f"Failed to save processed CSV: {e}"}), 500
-    
-    # Remove temporary upload file
-    try:
-        os.remove(upload_path)
-    except Exception as e:
-        print(f"[UPLOAD] Failed to remove temp file: {e}")
+    _write_parquet(reviewed_path, df)
+    _store_df(reviewed_path, df)
     
     # Create new session with expiry
-    token = uuid.uuid4().hex
-    expires_at = datetime.now() + timedelta(hours=SESSION_EXPIRY_HOURS)
-    
-    SESSIONS[token] = {
-        "csv_path": reviewed_path,
-        "created_at": datetime.now().isoformat(),
-        "expires_at": expires_at.isoformat(),
-        "last_accessed": datetime.now().isoformat(),
-        "original_filename": filename
-    }
-    save_sessions()
+    token = secrets.token_hex(16)
+    now = datetime.now()
+    now_iso = now.isoformat()
+    expires_at = now + timedelta(hours=SESSION_EXPIRY_HOURS)
     
-    # Clean up old sessions periodically
-    clean_expired_sessions()
+    with _SESSIONS_LOCK:
+        SESSIONS[token] = {
+            "csv_path": reviewed_path,
+            "created_at": now_iso,
+            "expires_at": expires_at.isoformat(),
+            "last_accessed": now_iso,
+            "original_filename": filename,
+            "total_rows": len(df)
+        }
+        save_session(token)
+        _track_expiry(token)
     
-    print(f"[UPLOAD] token={token} -> {reviewed_path} ({len(df)} rows, {duplicates_removed} duplicates removed, {removed_empty} empty links removed)")
+    logger.info("[UPLOAD] token=%s -> %s (%s rows, %s duplicates removed, %s empty links removed)", token, reviewed_path, len(df), duplicates_removed, removed_empty)
     
     return jsonify({
         "message": "CSV uploaded successfully",
@@ -395,79 +1088,89 @@ def session_check():
         session_data = SESSIONS.get(token, {})
         return jsonify({
             "hasSession": True,
-            "expires_at": session_data.get("expires_at")
+            "expires_at": session_data.get("expires_at"),
+            "total_rows": session_data.get("total_rows")
         }), 200
     else:
         return jsonify({"hasSession": False}), 200
 
+@app.route("/api/stats", methods=["GET"])
+def get_stats():
+    """Review progress for the current session, counted on the cached frame (no CSV parse when cached)"""
+    token, csv_path = get_session_from_request()
+    
+    if not token or not csv_path:
+        return jsonify({"error": "No CSV uploaded or invalid/expired token"}), 401
+    
+    try:
+        df = _load_df(csv_path)
+    except Exception as e:
+        logger.error("[STATS] pandas failed to read %s: %s", csv_path, e)
+        return jsonify({"error": f"Failed to read CSV: {e}"}), 500
+    
+    # Status is categorical, so this is a single pass over small integer codes
+    counts = df["Status"].value_counts()
+    accepted = int(counts.get("Accepted", 0))
+    rejected = int(counts.get("Rejected", 0))
+    return jsonify({
+        "total": len(df),
+        "accepted": accepted,
+        "rejected": rejected,
+        "pending": len(df) - accepted - rejected
+    }), 200
+
+def _stream_records(df: pd.DataFrame, columnar: bool = False):
+    """
+    Yield {"total": n, "data": [...]} in slices of DATA_CHUNK_ROWS rows so the
+    first bytes go out before the whole frame has been serialized.
+    columnar=True yields {"total": n, "columns": [...], "rows": [[...], ...]}
+    instead, which skips repeating every key in every row.
+    """
+    if columnar:
+        yield f'{{"total":{len(df)},"columns":{app.json.dumps(df.columns.tolist())},"rows":['
+    else:
+        yield f'{{"total":{len(df)},"data":['
+    orient = "values" if columnar else "records"
+    for start in range(0, len(df), DATA_CHUNK_ROWS):
+        # to_json serializes each slice in C; drop its brackets to splice the slices together
+        chunk = df.iloc[start:start + DATA_CHUNK_ROWS].to_json(orient=orient, force_ascii=False)
+        yield ("," if start else "") + chunk[1:-1]
+    yield "]}"
+
 @app.route("/api/data", methods=["GET"])
 def get_data():
     """Get all data for the current session"""
     token, csv_path = get_session_from_request()
-    print(f"[DATA] token={token}, csv_path={csv_path}")
+    logger.info("[DATA] token=%s, csv_path=%s", token, csv_path)
     
     if not token or not csv_path:
         return jsonify({"error": "No CSV uploaded or invalid/expired token"}), 401
     
     if not os.path.exists(csv_path):
-        print(f"[DATA] file not found at {csv_path}")
+        logger.warning("[DATA] file not found at %s", csv_path)
         return jsonify({"error": "CSV file not found on server"}), 404
 
     verifier = request.args.get("verifier")  # optional filter value
+    columnar = request.args.get("layout") == "columns"  # optional column-oriented payload
     
     try:
-        df = _read_csv_with_fallbacks(csv_path)
+        df = _load_df(csv_path)
     except Exception as e:
-        print(f"[DATA] pandas failed to read {csv_path}: {e}")
+        logger.error("[DATA] pandas failed to read %s: %s", csv_path, e)
         return jsonify({"error": f"Failed to read CSV: {e}"}), 500
     
-    # Normalize columns and ensure 'link' exists for the client
-    df, link_col = _normalize_columns_and_get_link_column(df)
-    if not link_col:
+    if "link" not in df.columns:
         return jsonify({"error": "'link' column missing in stored CSV"}), 500
 
-    # coerce to strings and fillna
-    df["link"] = df["link"].astype(str).str.strip()
-
-    # Normalize status column
-    if "Status" in df.columns:
-        df["Status"] = df["Status"].apply(_normalize_status_value)
-    else:
-        for c in df.columns:
-            if isinstance(c, str) and c.lower() == "status":
-                df = df.rename(columns={c: "Status"})
-                df["Status"] = df["Status"].apply(_normalize_status_value)
-                break
-        else:
-            df["Status"] = ""
-
-    # Ensure Feedback and Verified By columns exist (case-insensitive mapping)
-    if "Feedback" not in df.columns:
-        for c in df.columns:
-            if isinstance(c, str) and c.lower() == "feedback":
-                df = df.rename(columns={c: "Feedback"})
-                break
-        if "Feedback" not in df.columns:
-            df["Feedback"] = ""
-
-    # Detect verified column and normalize name to 'Verified By' if present
-    vcol = _find_verified_column(df)
-    if vcol and vcol != "Verified By":
-        df = df.rename(columns={vcol: "Verified By"})
-    if "Verified By" not in df.columns:
-        df["Verified By"] = ""
-
     # apply verifier filtering if requested
     if verifier:
         verifier = str(verifier).strip().lower()
-        # perform case-insensitive exact match on Verified By column
-        df = df[df["Verified By"].astype(str).str.strip().str.lower() == verifier].reset_index(drop=True)
+        # case-insensitive exact match on Verified By, via the per-file row index
+        rows = _verifier_index(csv_path, df).get(verifier)
+        df = (df.iloc[:0] if rows is None else df.take(rows)).reset_index(drop=True)
 
-    df = df.fillna("")
-    data = df.to_dict("records")
-    
-    print(f"[DATA] returning {len(data)} rows for token={token} (verifier filter={'none' if not verifier else verifier})")
-    return jsonify({"data": data, "total": len(data)}), 200
+    logger.info("[DATA] returning %s rows for token=%s (verifier filter=%s)", len(df), token, "none" if not verifier else verifier)
+    return app.response_class(_stream_records(df, columnar), status=200, mimetype="application/json")
 
 @app.route("/api/update-status", methods=["POST"])
 def update_status():
@@ -480,7 +1183,7 @@ def update_status():
     The function updates the CSV row that matches the link (preferred) or index.
     """
     token, csv_path = get_session_from_request()
-    print(f"[UPDATE] token={token}, csv_path={csv_path}")
+    logger.info("[UPDATE] token=%s, csv_path=%s", token, csv_path)
     
     if not token or not csv_path or not os.path.exists(csv_path):
         return jsonify({"error": "No CSV uploaded or invalid/expired token"}), 401
@@ -494,57 +1197,92 @@ def update_status():
     if status is None:
         return jsonify({"error": "Missing status"}), 400
     
-    try:
-        df = _read_csv_with_fallbacks(csv_path)
-    except Exception as e:
-        return jsonify({"error": f"Failed to read CSV: {e}"}), 500
+    # Hold the edits lock (other workers and threads on this file) from read to append
+    with _edits_lock(csv_path):
+        try:
+            df = _load_df(csv_path)
+        except Exception as e:
+            return jsonify({"error": f"Failed to read CSV: {e}"}), 500
     
-    # Normalize and ensure link column exists
-    df, link_col = _normalize_columns_and_get_link_column(df)
-    if not link_col:
-        return jsonify({"error": "'link' column missing in stored CSV"}), 500
+        if "link" not in df.columns:
+            return jsonify({"error": "'link' column missing in stored CSV"}), 500
 
-    # Normalize Status/Feedback columns presence
-    if "Status" not in df.columns:
-        df["Status"] = ""
-    if "Feedback" not in df.columns:
-        df["Feedback"] = ""
+        # Decide which row to update: prefer link match
+        target_idx, error = _resolve_row(csv_path, df, link, index)
+        if error:
+            return jsonify({"error": error}), 400
 
-    # Decide which row to update: prefer link match
-    target_idx = None
-    if link:
-        link = str(link).strip()
-        matches = df.index[df["link"].astype(str).str.strip() == link].tolist()
-        if len(matches) == 0:
-            return jsonify({"error": "Link not found"}), 400
-        target_idx = matches[0]
-    else:
-        # fallback to index if provided (legacy)
-        if index is None:
-            return jsonify({"error": "Missing index or link to identify row"}), 400
+        edit = _apply_status(df, target_idx, status, feedback)
+        canonical = edit["status"]
+
+        # Append to the edits log; the CSV itself is only rewritten on download
         try:
-            idx = int(index)
-        except Exception:
-            return jsonify({"error": "Invalid index (must be integer)"}), 400
+            _append_edits(csv_path, [edit])
+        except Exception as e:
+            logger.error("[UPDATE] Failed to write edit: %s", e)
+            _evict_df(csv_path)
+            return jsonify({"error": f"Failed to save CSV: {e}"}), 500
+        _store_df(csv_path, df)
+    
+    logger.info("[UPDATE] token=%s, target_idx=%s, status=%s, feedback=%s", token, target_idx, canonical, "(hidden)" if feedback else "none")
+    return jsonify({"message": f"Marked row {target_idx} as {canonical}"}), 200
 
-        if not (0 <= idx < len(df)):
-            return jsonify({"error": "Invalid index"}), 400
-        target_idx = idx
+@app.route("/api/update-status-bulk", methods=["POST"])
+def update_status_bulk():
+    """
+    Apply many status updates with one cache lookup and one edits-log append.
 
-    # Normalize incoming status to canonical values
-    canonical = _normalize_status_value(status)
-    df.loc[target_idx, "Status"] = canonical
-    df.loc[target_idx, "Feedback"] = feedback if canonical == "Rejected" else ""
+    Accepts { "updates": [ {"link"|"index": ..., "status": "...", "feedback": "..."}, ... ] }
+    (or the bare list). Items that cannot be applied are reported in "errors"
+    by their position in the list; the others are still saved.
+    """
+    token, csv_path = get_session_from_request()
+    logger.info("[BULK] token=%s, csv_path=%s", token, csv_path)
+    
+    if not token or not csv_path or not os.path.exists(csv_path):
+        return jsonify({"error": "No CSV uploaded or invalid/expired token"}), 401
+    
+    body = request.get_json(silent=True)
+    updates = body.get("updates") if isinstance(body, dict) else body
+    if not isinstance(updates, list) or not updates:
+        return jsonify({"error": "Missing updates list"}), 400
+    
+    with _edits_lock(csv_path):
+        try:
+            df = _load_df(csv_path)
+        except Exception as e:
+            return jsonify({"error": f"Failed to read CSV: {e}"}), 500
+        
+        if "link" not in df.columns:
+            return jsonify({"error": "'link' column missing in stored CSV"}), 500
 
-    df = df.fillna("")
-    try:
-        df.to_csv(csv_path, index=False, encoding="utf-8")
-    except Exception as e:
-        print(f"[UPDATE] Failed to write CSV: {e}")
-        return jsonify({"error": f"Failed to save CSV: {e}"}), 500
+        edits = []
+        errors = []
+        for position, item in enumerate(updates):
+            if not isinstance(item, dict) or item.get("status") is None:
+                errors.append({"position": position, "error": "Missing status"})
+                continue
+            target_idx, error = _resolve_row(csv_path, df, item.get("link"), item.get("index"))
+            if error:
+                errors.append({"position": position, "error": error})
+                continue
+            edits.append(_apply_status(df, target_idx, item["status"], item.get("feedback", "")))
+
+        if edits:
+            try:
+                _append_edits(csv_path, edits)
+            except Exception as e:
+                logger.error("[BULK] Failed to write edits: %s", e)
+                _evict_df(csv_path)
+                return jsonify({"error": f"Failed to save CSV: {e}"}), 500
+            _store_df(csv_path, df)
     
-    print(f"[UPDATE] token={token}, target_idx={target_idx}, status={canonical}, feedback={'(hidden)' if feedback else 'none'}")
-    return jsonify({"message": f"Marked row {target_idx} as {canonical}"}), 200
+    logger.info("[BULK] token=%s, updated=%s, errors=%s", token, len(edits), len(errors))
+    return jsonify({
+        "message": f"Updated {len(edits)} rows",
+        "updated": len(edits),
+        "errors": errors
+    }), (200 if edits or not errors else 400)
 
 @app.route("/api/download", methods=["GET"])
 def download_csv():
@@ -555,58 +1293,34 @@ def download_csv():
         return jsonify({"error": "No reviewed CSV available or invalid/expired token"}), 401
     
     try:
-        df = _read_csv_with_fallbacks(csv_path)
-        # Normalize column names and ensure 'link' exists
-        df, _ = _normalize_columns_and_get_link_column(df)
-
-        # Normalize status column before download
-        if "Status" in df.columns:
-            df["Status"] = df["Status"].apply(_normalize_status_value)
-        else:
-            for c in df.columns:
-                if isinstance(c, str) and c.lower() == "status":
-                    df = df.rename(columns={c: "Status"})
-                    df["Status"] = df["Status"].apply(_normalize_status_value)
-                    break
-
-        # Detect verified column and rename to 'Verified By' if present
-        vcol = _find_verified_column(df)
-        if vcol and vcol != "Verified By":
-            df = df.rename(columns={vcol: "Verified By"})
-        if "Verified By" not in df.columns:
-            df["Verified By"] = ""
-
-        # Remove duplicates that might have been added during review
-        if "link" in df.columns:
-            df = df.drop_duplicates(subset=["link"], keep="first")
-        
-        # Create a temporary file for download
-        temp_path = csv_path.replace(".csv", "_download.csv")
-        df.to_csv(temp_path, index=False, encoding="utf-8")
+        # Write out pending edits (and normalize files stored by older versions);
+        # a file already known to be canonical and up to date is sent without parsing it
+        if not _is_folded(csv_path):
+            _fold_edits(csv_path)
         
         # Get original filename from session
         session_data = SESSIONS.get(token, {})
         original_name = session_data.get("original_filename", "reviewed_results.csv")
         download_name = f"reviewed_{original_name}"
         
-        response = send_file(temp_path, as_attachment=True, download_name=download_name)
-        
-        # Clean up temp file after sending
-        @response.call_on_close
-        def cleanup():
-            try:
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-            except Exception as e:
-                print(f"Failed to cleanup temp file: {e}")
+        if X_ACCEL_REDIRECT_PREFIX:
+            # nginx streams the file itself; Python only sends the headers
+            response = app.response_class(mimetype="text/csv")
+            response.headers["X-Accel-Redirect"] = X_ACCEL_REDIRECT_PREFIX + os.path.basename(csv_path)
+            response.headers.set("Content-Disposition", "attachment", filename=download_name)
+            return response
         
-        return response
+        # Stream the file straight from disk (werkzeug uses sendfile where available)
+        # conditional=True answers If-None-Match/If-Modified-Since and Range requests
+        return send_file(csv_path, as_attachment=True, download_name=download_name,
+                         mimetype="text/csv", conditional=True)
     except Exception as e:
-        print(f"[DOWNLOAD] Error: {e}")
+        logger.error("[DOWNLOAD] Error: %s", e)
         return jsonify({"error": f"Download failed: {e}"}), 500
 
+# Local development only; production runs under gunicorn (see gunicorn.conf.py)
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     debug = os.environ.get("FLASK_ENV", "production") != "production"
-    print(f"[START] Flask server starting on :{port}")
+    logger.info("[START] Flask server starting on :%s", port)
     app.run(host="0.0.0.0", debug=debug, port=port)
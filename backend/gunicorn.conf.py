@@ -0,0 +1,23 @@
+# gunicorn.conf.py
+# Production entry point (run from the backend directory):
+#   gunicorn -c gunicorn.conf.py app:app
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# CSV parsing is CPU-bound, so scale processes with cores; threads keep cheap
+# requests (health checks, session checks) from queueing behind a slow parse.
+# Sessions are shared through SQLite, edits through the on-disk edits logs:
+# appends and folds hold an flock on the file's .lock, folds replace the CSV
+# atomically, and each worker's cache is keyed on the version it parsed.
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+# Keep imports per worker: app.py starts its log listener, session sweeper and
+# edits-folder threads at import, and threads do not survive the fork after preload.
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
@@ -0,0 +1,44 @@
+# conftest.py
+import importlib.util
+import io
+import itertools
+import os
+
+import pytest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+_worker_ids = itertools.count()
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Point UPLOAD_FOLDER / SESSIONS_DB at a fresh directory (app.py reads them at import)"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("UPLOAD_FOLDER", str(tmp_path / "uploads"))
+    monkeypatch.setenv("SESSIONS_DB", str(tmp_path / "sessions.db"))
+    monkeypatch.setenv("SESSIONS_FILE", str(tmp_path / "sessions.json"))
+    monkeypatch.setenv("LOG_LEVEL", "CRITICAL")
+    return tmp_path
+
+@pytest.fixture
+def make_worker(workdir):
+    """
+    Import app.py as a new module on every call. Each import has its own caches,
+    locks and threads, like a gunicorn worker, and they all share the workdir.
+    """
+    def _make():
+        spec = importlib.util.spec_from_file_location(f"viewer_worker_{next(_worker_ids)}", APP_PATH)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    return _make
+
+@pytest.fixture
+def worker(make_worker):
+    return make_worker()
+
+def upload(client, text: str, filename: str = "links.csv"):
+    """POST text as a CSV upload and return the session headers"""
+    r = client.post("/api/upload", data={"csv_file": (io.BytesIO(text.encode("utf-8")), filename)},
+                    content_type="multipart/form-data")
+    assert r.status_code == 200, r.get_json()
+    return {"X-Session-Token": r.get_json()["token"]}
@@ -0,0 +1,369 @@
+# test_app.py
+import csv
+import io
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from conftest import upload
+
+CSV = "Link,status,Feedback,verified_by,Other\na,accept,,Alice,x\nb,,,bob,y\nc,,,Alice,z\n"
+
+def _rows(text: str):
+    return list(csv.DictReader(io.StringIO(text)))
+
+def _download(client, headers):
+    r = client.get("/api/download", headers=headers)
+    assert r.status_code == 200
+    text = r.data.decode("utf-8")
+    r.close()
+    return text
+
+def _csv_path(worker, headers):
+    return worker.SESSIONS[headers["X-Session-Token"]]["csv_path"]
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+def test_upload_update_fold_download_round_trip(worker):
+    """Edits land in the log, the fold thread writes them into the CSV, download returns them"""
+    worker.EDITS_FOLD_SECONDS = 0.05
+    c = worker.app.test_client()
+    h = upload(c, CSV)
+    csv_path = _csv_path(worker, h)
+
+    assert c.post("/api/update-status", headers=h, json={"link": "b", "status": "rej", "feedback": "broken"}).status_code == 200
+    r = c.post("/api/update-status-bulk", headers=h, json={"updates": [{"link": "c", "status": "accepted"}, {"link": "zz", "status": "a"}]})
+    assert r.get_json()["updated"] == 1 and r.get_json()["errors"] == [{"position": 1, "error": "Link not found"}]
+
+    assert _wait_for(lambda: not os.path.exists(worker._edits_path(csv_path)))
+    on_disk = {row["link"]: row for row in _rows(open(csv_path, encoding="utf-8").read())}
+    assert (on_disk["b"]["Status"], on_disk["b"]["Feedback"], on_disk["c"]["Status"]) == ("Rejected", "broken", "Accepted")
+
+    rows = _rows(_download(c, h))
+    assert [(row["link"], row["Status"], row["Feedback"]) for row in rows] == [
+        ("a", "Accepted", ""), ("b", "Rejected", "broken"), ("c", "Accepted", "")]
+    assert list(rows[0]) == ["link", "Status", "Feedback", "Verified By", "Other"]
+
+def test_concurrent_fold_keeps_other_workers_edit(make_worker):
+    """An edit appended by worker B while worker A is folding must not be dropped with A's log"""
+    a, b = make_worker(), make_worker()
+    a.EDITS_FOLD_SECONDS = b.EDITS_FOLD_SECONDS = 3600
+    h = upload(a.app.test_client(), CSV)
+    csv_path = _csv_path(a, h)
+    a.app.test_client().post("/api/update-status", headers=h, json={"link": "a", "status": "reject"})
+
+    responses = []
+    b_update = threading.Thread(target=lambda: responses.append(b.app.test_client().post(
+        "/api/update-status", headers=h, json={"link": "b", "status": "reject", "feedback": "late"})))
+    write_parquet = a._write_parquet
+
+    def _write_parquet_during_b_update(path, df):
+        # A has read the log; let B try to append before A goes on to remove it
+        b_update.start()
+        time.sleep(0.3)
+        write_parquet(path, df)
+
+    a._write_parquet = _write_parquet_during_b_update
+    a._fold_edits(csv_path)
+    a._write_parquet = write_parquet
+    b_update.join(5)
+    assert responses[0].status_code == 200
+
+    data = b.app.test_client().get("/api/data", headers=h).get_json()["data"]
+    assert [(row["link"], row["Status"]) for row in data][:2] == [("a", "Rejected"), ("b", "Rejected")]
+    rows = _rows(_download(a.app.test_client(), h))
+    assert (rows[1]["Status"], rows[1]["Feedback"]) == ("Rejected", "late")
+
+def test_edits_log_is_replayed_by_a_fresh_worker(make_worker):
+    """A worker that never saw the edits rebuilds them from the base file plus the log"""
+    a = make_worker()
+    a.EDITS_FOLD_SECONDS = 3600
+    h = upload(a.app.test_client(), CSV)
+    a.app.test_client().post("/api/update-status", headers=h, json={"link": "a", "status": "reject", "feedback": "dup"})
+    assert os.path.exists(a._edits_path(_csv_path(a, h)))
+
+    b = make_worker()
+    data = b.app.test_client().get("/api/data", headers=h).get_json()["data"]
+    assert [(row["link"], row["Status"], row["Feedback"]) for row in data][0] == ("a", "Rejected", "dup")
+
+def test_appends_by_another_worker_are_replayed_incrementally(make_worker):
+    """When only the log grew, a worker applies the new lines to its cached frame instead of re-parsing"""
+    a, b = make_worker(), make_worker()
+    a.EDITS_FOLD_SECONDS = b.EDITS_FOLD_SECONDS = 3600
+    h = upload(a.app.test_client(), CSV)
+    a.app.test_client().post("/api/update-status", headers=h, json={"link": "a", "status": "reject"})
+    b.app.test_client().get("/api/data", headers=h)
+    read_reviewed, parsed = b._read_reviewed, []
+    b._read_reviewed = lambda path: parsed.append(path) or read_reviewed(path)
+
+    a.app.test_client().post("/api/update-status-bulk", headers=h, json={"updates": [
+        {"link": "b", "status": "reject", "feedback": "late"}, {"link": "a", "status": "accept"}]})
+    data = b.app.test_client().get("/api/data", headers=h).get_json()["data"]
+    assert [(row["Status"], row["Feedback"]) for row in data] == [("Accepted", ""), ("Rejected", "late"), ("", "")]
+    assert parsed == []
+    assert b._DF_CACHE[_csv_path(b, h)][0] == b._df_version(_csv_path(b, h))
+
+def test_line_still_being_appended_is_replayed_once_complete(worker):
+    c = worker.app.test_client()
+    h = upload(c, CSV)
+    line = b'{"link": "c", "status": "Rejected", "feedback": "slow"}\n'
+    with open(worker._edits_path(_csv_path(worker, h)), "ab") as f:
+        f.write(line[:20])
+        f.flush()
+        assert c.get("/api/data", headers=h).get_json()["data"][2]["Status"] == ""
+        f.write(line[20:])
+    data = c.get("/api/data", headers=h).get_json()["data"]
+    assert (data[2]["Status"], data[2]["Feedback"]) == ("Rejected", "slow")
+
+def test_frame_parsed_during_a_fold_is_not_cached_as_current(make_worker):
+    """A worker whose parse overlaps another worker's fold must reload instead of keeping the stale frame"""
+    a, b = make_worker(), make_worker()
+    a.EDITS_FOLD_SECONDS = b.EDITS_FOLD_SECONDS = 3600
+    h = upload(a.app.test_client(), CSV)
+    csv_path = _csv_path(a, h)
+    a.app.test_client().post("/api/update-status", headers=h, json={"link": "c", "status": "reject", "feedback": "f"})
+    read_reviewed = b._read_reviewed
+
+    def _read_then_fold(path):
+        df = read_reviewed(path)
+        # A folds after B read the base file but before B replays the (now removed) log
+        a._fold_edits(path)
+        return df
+
+    b._read_reviewed = _read_then_fold
+    b.app.test_client().get("/api/data", headers=h)
+    b._read_reviewed = read_reviewed
+
+    data = b.app.test_client().get("/api/data", headers=h).get_json()["data"]
+    assert (data[2]["Status"], data[2]["Feedback"]) == ("Rejected", "f")
+    assert not os.path.exists(a._edits_path(csv_path))
+
+def test_verified_date_header_is_kept(worker):
+    """Only real Verified By variants are renamed at upload; other 'verified' columns survive"""
+    c = worker.app.test_client()
+    h = upload(c, "link,Verified Date\nx,2024-01-01\n")
+    rows = _rows(_download(c, h))
+    assert list(rows[0]) == ["link", "Verified Date", "Status", "Feedback", "Verified By"]
+    assert rows[0]["Verified Date"] == "2024-01-01" and rows[0]["Verified By"] == ""
+    assert c.get("/api/data?verifier=2024-01-01", headers=h).get_json()["total"] == 0
+
+def test_verifier_filter(worker):
+    c = worker.app.test_client()
+    h = upload(c, CSV)
+    data = c.get("/api/data?verifier= ALICE ", headers=h).get_json()["data"]
+    assert [row["link"] for row in data] == ["a", "c"]
+    assert c.get("/api/data?verifier=nobody", headers=h).get_json() == {"total": 0, "data": []}
+
+def test_legacy_reviewed_file_is_normalized(worker):
+    """Reviewed files written by older versions download in canonical form and are rewritten once"""
+    csv_path = os.path.join(worker.UPLOAD_FOLDER, "legacy_reviewed.csv")
+    with open(csv_path, "w", encoding="utf-8") as f:
+        f.write("link,Status,Feedback\na,accept,\nb,REJECTED,bad\n")
+    now = datetime.now()
+    token = "0" * 32
+    worker.SESSIONS[token] = {"csv_path": csv_path, "created_at": now.isoformat(), "last_accessed": now.isoformat(),
+                              "expires_at": (now + timedelta(hours=1)).isoformat()}
+    worker.save_session(token)
+
+    text = _download(worker.app.test_client(), {"X-Session-Token": token})
+    assert text.splitlines() == ["link,Status,Feedback,Verified By", "a,Accepted,,", "b,Rejected,bad,"]
+    assert open(csv_path, encoding="utf-8").read() == text
+    assert csv_path not in worker._NEEDS_REWRITE
+
+def test_unedited_download_is_not_parsed(make_worker):
+    """A worker that never loaded the file streams it as-is when nothing is pending"""
+    a, b = make_worker(), make_worker()
+    a.EDITS_FOLD_SECONDS = 3600
+    h = upload(a.app.test_client(), CSV)
+    read_reviewed, parsed = b._read_reviewed, []
+    b._read_reviewed = lambda path: parsed.append(path) or read_reviewed(path)
+
+    assert _rows(_download(b.app.test_client(), h))[1]["Status"] == ""
+    # without pyarrow there is no Parquet copy to vouch for the CSV, so b has to read it once
+    assert parsed == ([] if b.HAS_PYARROW else [_csv_path(b, h)])
+    a.app.test_client().post("/api/update-status", headers=h, json={"link": "b", "status": "reject"})
+    assert _rows(_download(b.app.test_client(), h))[1]["Status"] == "Rejected"
+
+def test_fold_replaces_files_instead_of_rewriting_them(worker):
+    """Readers may memory-map the CSV and Parquet copy, so a fold must swap in new inodes"""
+    worker.EDITS_FOLD_SECONDS = 3600
+    c = worker.app.test_client()
+    h = upload(c, CSV)
+    csv_path = _csv_path(worker, h)
+    paths = [csv_path] + ([worker._parquet_path(csv_path)] if worker.HAS_PYARROW else [])
+    inodes = [os.stat(p).st_ino for p in paths]
+
+    c.post("/api/update-status", headers=h, json={"link": "a", "status": "reject"})
+    worker._fold_edits(csv_path)
+    assert all(os.stat(p).st_ino != ino for p, ino in zip(paths, inodes))
+    assert not [name for name in os.listdir(worker.UPLOAD_FOLDER) if name.endswith(".tmp")]
+
+def test_fold_does_not_block_other_sessions(worker):
+    """Requests for another file are served while a fold is still writing"""
+    worker.EDITS_FOLD_SECONDS = 3600
+    c = worker.app.test_client()
+    h_a, h_b = upload(c, CSV), upload(c, CSV)
+    c.get("/api/stats", headers=h_b)
+    c.post("/api/update-status", headers=h_a, json={"link": "a", "status": "reject"})
+    writing, release = threading.Event(), threading.Event()
+    write_parquet = worker._write_parquet
+
+    def _slow_write_parquet(path, df):
+        writing.set()
+        release.wait(5)
+        write_parquet(path, df)
+
+    worker._write_parquet = _slow_write_parquet
+    fold = threading.Thread(target=worker._fold_edits, args=(_csv_path(worker, h_a),))
+    fold.start()
+    try:
+        assert writing.wait(5)
+        stats = []
+        request = threading.Thread(target=lambda: stats.append(c.get("/api/stats", headers=h_b).status_code))
+        request.start()
+        request.join(2)
+        assert stats == [200]
+    finally:
+        release.set()
+        fold.join(5)
+        worker._write_parquet = write_parquet
+
+def test_cold_load_does_not_block_other_sessions(worker):
+    """Parsing one file holds only that file's lock"""
+    c = worker.app.test_client()
+    h_a, h_b = upload(c, CSV), upload(c, CSV)
+    c.get("/api/stats", headers=h_b)
+    worker._evict_df(_csv_path(worker, h_a))
+    parsing, release = threading.Event(), threading.Event()
+    read_reviewed = worker._read_reviewed
+
+    def _slow_read_reviewed(path):
+        parsing.set()
+        release.wait(5)
+        return read_reviewed(path)
+
+    worker._read_reviewed = _slow_read_reviewed
+    load = threading.Thread(target=lambda: c.get("/api/stats", headers=h_a))
+    load.start()
+    try:
+        assert parsing.wait(5)
+        worker._read_reviewed = read_reviewed
+        stats = []
+        request = threading.Thread(target=lambda: stats.append(c.get("/api/stats", headers=h_b).status_code))
+        request.start()
+        request.join(2)
+        assert stats == [200]
+    finally:
+        release.set()
+        load.join(5)
+        worker._read_reviewed = read_reviewed
+
+def test_expired_session_of_another_worker_is_swept(make_worker):
+    a, b = make_worker(), make_worker()
+    h = upload(b.app.test_client(), CSV)
+    token = h["X-Session-Token"]
+    csv_path = _csv_path(b, h)
+    b._DB.execute("UPDATE sessions SET expires_at = ? WHERE token = ?",
+                  ((datetime.now() - timedelta(minutes=1)).isoformat(), token))
+
+    a.clean_expired_sessions()
+    assert a._DB.execute("SELECT COUNT(*) FROM sessions WHERE token = ?", (token,)).fetchone()[0] == 0
+    assert not os.path.exists(csv_path)
+
+def test_sweep_removes_files_outside_the_sessions_lock(worker):
+    """Session lookups from other threads must not wait while expired files are deleted"""
+    h = upload(worker.app.test_client(), CSV)
+    worker._DB.execute("UPDATE sessions SET expires_at = ? WHERE token = ?",
+                       ((datetime.now() - timedelta(minutes=1)).isoformat(), h["X-Session-Token"]))
+    remove_reviewed_files = worker._remove_reviewed_files
+    lock_free = []
+
+    def _probe():
+        acquired = worker._SESSIONS_LOCK.acquire(timeout=1)
+        lock_free.append(acquired)
+        if acquired:
+            worker._SESSIONS_LOCK.release()
+
+    def _check_lock_then_remove(csv_path):
+        probe = threading.Thread(target=_probe)
+        probe.start()
+        probe.join()
+        remove_reviewed_files(csv_path)
+
+    worker._remove_reviewed_files = _check_lock_then_remove
+    try:
+        worker.clean_expired_sessions()
+    finally:
+        worker._remove_reviewed_files = remove_reviewed_files
+    assert lock_free == [True]
+
+def test_upload_over_limit_is_rejected(worker):
+    worker.app.config["MAX_CONTENT_LENGTH"] = 1024
+    r = worker.app.test_client().post("/api/upload", data={"csv_file": (io.BytesIO(b"link\n" + b"x" * 4096), "big.csv")},
+                                      content_type="multipart/form-data")
+    assert r.status_code == 413 and "error" in r.get_json()
+
+def test_encoding_cache_is_bounded(worker, tmp_path):
+    worker._ENCODING_CACHE_SIZE = 2
+    for i in range(3):
+        path = tmp_path / f"f{i}.csv"
+        path.write_text("link\na\n", encoding="utf-8")
+        assert worker._detect_encoding(str(path)) == "utf-8"
+    assert list(worker._ENCODING_CACHE) == [str(tmp_path / "f1.csv"), str(tmp_path / "f2.csv")]
+def test_short_accented_samples_are_not_misdetected(worker):
+    """Short Latin-1 samples used to come back as cp1006 and decode to garbage"""
+    assert worker._detect_encoding_bytes("link,n\ny,café\n".encode("latin1"), complete=True) == "latin1"
+    sentence = "link,text\nx,Le problème de la société française est très compliqué à résoudre\n"
+    assert worker._detect_encoding_bytes(sentence.encode("cp1252"), complete=True) == "cp1252"
+    assert worker._detect_encoding_bytes("link,n\ny,café\n".encode("utf-8"), complete=True) == "utf-8"
+
+def test_status_series_matches_scalar_normalization(worker):
+    values = ["accept", " Accepted ", "ACEPT", "acpt", "accepted!", "rej", "REJECTED", "reject later",
+              "Rejected!", "weird", "", "  pending  ", "Accepted"]
+    series = worker._normalize_status_series(worker.pd.Series(values, dtype=str))
+    assert series.tolist() == [worker._normalize_status_value(v) for v in values]
+
+def test_stats_counts_review_progress(worker):
+    c = worker.app.test_client()
+    h = upload(c, CSV)
+    c.post("/api/update-status", headers=h, json={"link": "b", "status": "reject", "feedback": "no"})
+    assert c.get("/api/stats", headers=h).get_json() == {"total": 3, "accepted": 1, "rejected": 1, "pending": 1}
+    assert c.get("/api/session-check", headers=h).get_json()["total_rows"] == 3
+    assert c.get("/api/stats").status_code == 401
+
+def test_download_through_x_accel_redirect(worker):
+    """With X_ACCEL_REDIRECT_PREFIX set, only headers are sent and nginx serves the (folded) file"""
+    worker.X_ACCEL_REDIRECT_PREFIX = "/protected/"
+    c = worker.app.test_client()
+    h = upload(c, CSV)
+    c.post("/api/update-status", headers=h, json={"link": "c", "status": "accept"})
+    r = c.get("/api/download", headers=h)
+    csv_path = _csv_path(worker, h)
+    assert r.status_code == 200 and r.data == b""
+    assert r.headers["X-Accel-Redirect"] == "/protected/" + os.path.basename(csv_path)
+    assert r.headers["Content-Disposition"] == "attachment; filename=reviewed_links.csv"
+    assert not os.path.exists(worker._edits_path(csv_path))
+    assert _rows(open(csv_path, encoding="utf-8").read())[2]["Status"] == "Accepted"
+
+def test_columnar_layout_matches_records(worker):
+    worker.DATA_CHUNK_ROWS = 2
+    c = worker.app.test_client()
+    h = upload(c, CSV)
+    records = c.get("/api/data", headers=h).get_json()
+    columnar = c.get("/api/data?layout=columns&verifier=alice", headers=h).get_json()
+    assert columnar["columns"] == ["link", "Status", "Feedback", "Verified By", "Other"]
+    assert columnar["total"] == 2
+    expected = [row for row in records["data"] if row["Verified By"] == "Alice"]
+    assert [dict(zip(columnar["columns"], row)) for row in columnar["rows"]] == expected
+
+def test_importing_twice_keeps_one_log_handler(make_worker):
+    a, b = make_worker(), make_worker()
+    queue_handlers = [h for h in a.logger.handlers if isinstance(h, a.logging.handlers.QueueHandler)]
+    assert a.logger is b.logger and len(queue_handlers) == 1